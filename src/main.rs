@@ -69,6 +69,7 @@ struct WebSocketRequest {
     #[serde(rename = "type")]
     msg_type: String,
     image: Option<String>, // Base64 编码的图片数据
+    images: Option<Vec<String>>, // 批量检测的 Base64 图片列表
 }
 
 #[derive(Debug, Serialize)]
@@ -83,6 +84,15 @@ struct WebSocketResponse {
     error: Option<String>,
 }
 
+#[derive(Debug, Serialize)]
+struct WebSocketBatchResponse {
+    #[serde(rename = "type")]
+    msg_type: String,
+    success: bool,
+    message: String,
+    results: Vec<WebSocketResponse>, // 与请求中的图片一一对应
+}
+
 #[derive(Debug, Deserialize)]
 struct HealthQuery {
     #[serde(default)]
@@ -587,6 +597,16 @@ async fn handle_websocket(socket: WebSocket) {
                 
                 // 解析请求
                 match serde_json::from_str::<WebSocketRequest>(&text) {
+                    Ok(request) if request.msg_type == "detect_batch" => {
+                        let response = handle_websocket_batch_request(request).await;
+                        
+                        if let Ok(response_json) = serde_json::to_string(&response) {
+                            if sender.send(Message::Text(response_json)).await.is_err() {
+                                error!("Failed to send WebSocket batch response");
+                                break;
+                            }
+                        }
+                    }
                     Ok(request) => {
                         let response = handle_websocket_request(request).await;
                         
@@ -722,6 +742,50 @@ async fn handle_websocket_request(request: WebSocketRequest) -> WebSocketRespons
     }
 }
 
+// 单个批量检测请求允许的最大图片数
+const MAX_BATCH_IMAGES: usize = 32;
+
+// 处理WebSocket批量检测请求，按请求顺序返回每张图片的结果
+async fn handle_websocket_batch_request(request: WebSocketRequest) -> WebSocketBatchResponse {
+    let images = match request.images {
+        Some(images) => images,
+        None => {
+            return WebSocketBatchResponse {
+                msg_type: "error".to_string(),
+                success: false,
+                message: "Missing images data".to_string(),
+                results: Vec::new(),
+            };
+        }
+    };
+    
+    if images.len() > MAX_BATCH_IMAGES {
+        return WebSocketBatchResponse {
+            msg_type: "error".to_string(),
+            success: false,
+            message: format!("Too many images in batch: {} (max {})", images.len(), MAX_BATCH_IMAGES),
+            results: Vec::new(),
+        };
+    }
+    
+    let mut results = Vec::with_capacity(images.len());
+    for image in images {
+        let single_request = WebSocketRequest {
+            msg_type: "detect".to_string(),
+            image: Some(image),
+            images: None,
+        };
+        results.push(handle_websocket_request(single_request).await);
+    }
+    
+    WebSocketBatchResponse {
+        msg_type: "batch_result".to_string(),
+        success: true,
+        message: format!("Processed {} image(s)", results.len()),
+        results,
+    }
+}
+
 // 处理WebSocket二进制请求
 async fn handle_websocket_binary_request(binary_data: Vec<u8>) -> WebSocketResponse {
     match detect_qr_from_binary(binary_data).await {
@@ -1,26 +1,99 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
+import asyncio
+import httpx
+import numpy as np
+import orjson
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import statistics
+import uuid
 import threading
-import json
+import itertools
+import socket
 import base64
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import functools
 import sys
 from pathlib import Path
 
+# 连接池大小（覆盖最大并发数）
+POOL_SIZE = 64
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+
+# 客户端套接字选项：禁用 Nagle 算法，开启 TCP keepalive
+SOCKET_OPTIONS = [
+    (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1),
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+]
+
+# 服务器不压缩响应，声明 identity 以跳过客户端解压处理
+CLIENT_HEADERS = {'Connection': 'keep-alive', 'Accept-Encoding': 'identity'}
+
+# print_results 使用的结构化指标数组（单位 ms，响应大小为 bytes）
+METRICS_DTYPE = np.dtype([
+    ('client', 'f8'), ('server', 'f8'), ('decode', 'f8'), ('detect', 'f8'), ('pool', 'f8'),
+    ('prepare', 'f8'), ('request', 'f8'), ('parse', 'f8'), ('respsize', 'f8'),
+])
+
+# 进度输出最小间隔（100ms，即最多 10 Hz）
+PROGRESS_INTERVAL_NS = 100_000_000
+
+@functools.lru_cache(maxsize=1)
+def _read_test_image(path):
+    """读取测试图片（同一路径只读取一次）"""
+    return Path(path).read_bytes()
+
+def elapsed_ms(start_ns):
+    """计算自 perf_counter_ns 起点以来经过的毫秒数"""
+    return (time.perf_counter_ns() - start_ns) / 1_000_000
+
+class NoDelayAdapter(HTTPAdapter):
+    """连接池使用 SOCKET_OPTIONS 的HTTP适配器"""
+    def init_poolmanager(self, *args, **kwargs):
+        kwargs['socket_options'] = SOCKET_OPTIONS
+        super().init_poolmanager(*args, **kwargs)
+
 class QRCodeBenchmark:
+    # 按线程、按 base_url 缓存的HTTP会话，多个实例共享同一连接池
+    _local = threading.local()
+    
     def __init__(self, base_url="http://localhost:3000"):
         self.base_url = base_url
         self.test_image_path = "test_qr.png"
         self.results = []
+        # 预构建的请求体，由 load_test_image 填充（首次发请求前自动加载）
+        self.b64_payload_bytes = None
+        self.multipart_body = None
+        self.multipart_headers = None
+        # 所有异步测试共用同一个事件循环和异步客户端，连接池跨测试复用
+        self._runner = None
+        self._async_client = None
+    
+    @staticmethod
+    def _build_session():
+        """创建带连接池的HTTP会话"""
+        session = requests.Session()
+        adapter = NoDelayAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE, max_retries=0)
+        session.mount('http://', adapter)
+        session.mount('https://', adapter)
+        session.headers.update(CLIENT_HEADERS)
+        return session
+    
+    @property
+    def session(self):
+        """当前线程访问 base_url 的HTTP会话（首次访问时创建）"""
+        sessions = self._local.__dict__.setdefault('sessions', {})
+        session = sessions.get(self.base_url)
+        if session is None:
+            session = sessions[self.base_url] = self._build_session()
+        return session
         
     def check_service_health(self):
         """检查服务健康状态"""
         try:
-            response = requests.get(f"{self.base_url}/health?verbose=true", timeout=5)
+            response = self.session.get(f"{self.base_url}/health?verbose=true", timeout=5)
             if response.status_code == 200:
                 health_data = response.json()
                 print("✅ 服务状态正常")
@@ -39,202 +112,333 @@ class QRCodeBenchmark:
     
     def load_test_image(self):
         """加载测试图片"""
-        if not Path(self.test_image_path).exists():
+        try:
+            data = _read_test_image(self.test_image_path)
+        except FileNotFoundError:
             print(f"❌ 测试图片不存在: {self.test_image_path}")
             return None
+        if not data:
+            print(f"❌ 测试图片为空: {self.test_image_path}")
+            return None
         
-        with open(self.test_image_path, 'rb') as f:
-            return f.read()
+        # 预先构建Base64请求体，避免每次请求重复编码
+        self.b64_payload_bytes = orjson.dumps({'image': base64.b64encode(data).decode('ascii')})
+        
+        # 预先构建multipart请求体，避免每次请求重新编码表单
+        boundary = uuid.uuid4().hex.encode('ascii')
+        self.multipart_body = (
+            b'--%b\r\nContent-Disposition: form-data; name="file"; filename="test.png"\r\n'
+            b'Content-Type: image/png\r\n\r\n%b\r\n--%b--\r\n' % (boundary, data, boundary))
+        self.multipart_headers = {
+            'Content-Type': f"multipart/form-data; boundary={boundary.decode('ascii')}"}
+        return data
+    
+    def _ensure_payloads(self):
+        """确保预构建的请求体已就绪，未加载时自动调用 load_test_image"""
+        if self.multipart_body is None and self.load_test_image() is None:
+            raise RuntimeError(f"无法加载测试图片: {self.test_image_path}")
     
-    def single_request_file(self, image_data):
-        """单次文件上传请求"""
+    def single_request_file(self):
+        """单次文件上传请求（使用预构建的请求体）"""
+        self._ensure_payloads()
         # 分阶段计时
-        start_time = time.time()
-        prepare_start = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            files = {'file': ('test.png', image_data, 'image/png')}
-            prepare_time = time.time() - prepare_start
+            request_start_ns = time.perf_counter_ns()
+            response = self.session.post(f"{self.base_url}/detect/file", data=self.multipart_body,
+                                         headers=self.multipart_headers, timeout=30)
+            request_time = elapsed_ms(request_start_ns)
             
-            request_start = time.time()
-            response = requests.post(f"{self.base_url}/detect/file", files=files, timeout=30)
-            request_time = time.time() - request_start
-            
-            parse_start = time.time()
+            parse_start_ns = time.perf_counter_ns()
             if response.status_code == 200:
-                data = response.json()
-                parse_time = time.time() - parse_start
+                body = response.content
+                data = orjson.loads(body)
+                parse_time = elapsed_ms(parse_start_ns)
                 
-                end_time = time.time()
-                total_client_time = (end_time - start_time) * 1000
+                return {
+                    'success': True,
+                    'total_time': elapsed_ms(start_ns),  # ms
+                    'prepare_time': 0.0,           # 请求体已预先构建
+                    'request_time': request_time,  # 网络+服务器时间
+                    'parse_time': parse_time,     # 响应解析时间
+                    'server_stats': data.get('statistics', {}),
+                    'qr_count': data.get('count', 0),
+                    'response_size': len(body)
+                }
+            else:
+                return {
+                    'success': False,
+                    'total_time': elapsed_ms(start_ns),
+                    'error': f"HTTP {response.status_code}"
+                }
+        except Exception as e:
+            return {
+                'success': False,
+                'total_time': elapsed_ms(start_ns),
+                'error': str(e)
+            }
+    
+    def single_request_base64(self):
+        """单次Base64请求（使用预构建的请求体）"""
+        self._ensure_payloads()
+        start_ns = time.perf_counter_ns()
+        try:
+            response = self.session.post(f"{self.base_url}/detect/base64",
+                                         data=self.b64_payload_bytes,
+                                         headers=JSON_HEADERS, timeout=30)
+            total_time = elapsed_ms(start_ns)
+            
+            if response.status_code == 200:
+                data = orjson.loads(response.content)
+                return {
+                    'success': True,
+                    'total_time': total_time,
+                    'server_stats': data.get('statistics', {}),
+                    'qr_count': data.get('count', 0)
+                }
+            else:
+                return {
+                    'success': False,
+                    'total_time': total_time,
+                    'error': f"HTTP {response.status_code}"
+                }
+        except Exception as e:
+            return {
+                'success': False,
+                'total_time': elapsed_ms(start_ns),
+                'error': str(e)
+            }
+    
+    def _make_async_client(self):
+        """创建异步HTTP客户端（HTTP/2 多路复用）"""
+        limits = httpx.Limits(max_connections=POOL_SIZE, max_keepalive_connections=POOL_SIZE)
+        transport = httpx.AsyncHTTPTransport(http2=True, limits=limits, socket_options=SOCKET_OPTIONS)
+        return httpx.AsyncClient(transport=transport, headers=CLIENT_HEADERS, timeout=30)
+    
+    def _run_async(self, coro):
+        """在共享的事件循环上运行协程"""
+        if self._runner is None:
+            self._runner = asyncio.Runner()
+        return self._runner.run(coro)
+    
+    async def _get_async_client(self, concurrent_count):
+        """获取共享的异步客户端，并在计时前预热到 concurrent_count 个连接"""
+        if self._async_client is None:
+            self._async_client = self._make_async_client()
+        client = self._async_client
+        await asyncio.gather(*(self._single_request_file_async(client) for _ in range(concurrent_count)))
+        return client
+    
+    def close(self):
+        """关闭异步客户端和事件循环"""
+        if self._runner is not None:
+            if self._async_client is not None:
+                self._runner.run(self._async_client.aclose())
+                self._async_client = None
+            self._runner.close()
+            self._runner = None
+    
+    async def _single_request_file_async(self, client):
+        """单次文件上传请求（异步，使用预构建的请求体）"""
+        start_ns = time.perf_counter_ns()
+        
+        try:
+            request_start_ns = time.perf_counter_ns()
+            response = await client.post(f"{self.base_url}/detect/file", content=self.multipart_body,
+                                         headers=self.multipart_headers)
+            request_time = elapsed_ms(request_start_ns)
+            
+            parse_start_ns = time.perf_counter_ns()
+            if response.status_code == 200:
+                body = response.content
+                data = orjson.loads(body)
+                parse_time = elapsed_ms(parse_start_ns)
                 
                 return {
                     'success': True,
-                    'total_time': total_client_time,  # ms
-                    'prepare_time': prepare_time * 1000,  # 请求准备时间
-                    'request_time': request_time * 1000,  # 网络+服务器时间
-                    'parse_time': parse_time * 1000,     # 响应解析时间
+                    'total_time': elapsed_ms(start_ns),  # ms
+                    'prepare_time': 0.0,           # 请求体已预先构建
+                    'request_time': request_time,  # 网络+服务器时间
+                    'parse_time': parse_time,     # 响应解析时间
                     'server_stats': data.get('statistics', {}),
                     'qr_count': data.get('count', 0),
-                    'response_size': len(response.content)
+                    'response_size': len(body)
                 }
             else:
-                end_time = time.time()
                 return {
                     'success': False,
-                    'total_time': (end_time - start_time) * 1000,
+                    'total_time': elapsed_ms(start_ns),
                     'error': f"HTTP {response.status_code}"
                 }
         except Exception as e:
-            end_time = time.time()
             return {
                 'success': False,
-                'total_time': (end_time - start_time) * 1000,
+                'total_time': elapsed_ms(start_ns),
                 'error': str(e)
             }
     
-    def single_request_base64(self, image_data):
-        """单次Base64请求"""
-        start_time = time.time()
+    async def _single_request_base64_async(self, client):
+        """单次Base64请求（异步，使用预构建的请求体）"""
+        start_ns = time.perf_counter_ns()
         try:
-            b64_data = base64.b64encode(image_data).decode('utf-8')
-            payload = {'image': b64_data}
-            response = requests.post(f"{self.base_url}/detect/base64", 
-                                   json=payload, timeout=30)
-            end_time = time.time()
+            response = await client.post(f"{self.base_url}/detect/base64",
+                                         content=self.b64_payload_bytes, headers=JSON_HEADERS)
+            total_time = elapsed_ms(start_ns)
             
             if response.status_code == 200:
-                data = response.json()
+                data = orjson.loads(response.content)
                 return {
                     'success': True,
-                    'total_time': (end_time - start_time) * 1000,
+                    'total_time': total_time,
                     'server_stats': data.get('statistics', {}),
                     'qr_count': data.get('count', 0)
                 }
             else:
                 return {
                     'success': False,
-                    'total_time': (end_time - start_time) * 1000,
+                    'total_time': total_time,
                     'error': f"HTTP {response.status_code}"
                 }
         except Exception as e:
-            end_time = time.time()
             return {
                 'success': False,
-                'total_time': (end_time - start_time) * 1000,
+                'total_time': elapsed_ms(start_ns),
                 'error': str(e)
             }
     
-    def warmup(self, image_data, warmup_count=10):
+    async def _run_concurrent(self, request_funcs, concurrent_count):
+        """以最多 concurrent_count 个在途请求执行所有请求，返回 (结果, 总耗时)"""
+        loop = asyncio.get_running_loop()
+        semaphore = asyncio.Semaphore(concurrent_count)
+        total_requests = len(request_funcs)
+        completed = 0
+        last_print_ns = 0
+        
+        client = await self._get_async_client(concurrent_count)
+        
+        async def run_one(func):
+            nonlocal completed, last_print_ns
+            async with semaphore:
+                result = await func(client)
+            completed += 1
+            # 限制进度输出频率，避免终端输出干扰计时
+            now_ns = time.perf_counter_ns()
+            if now_ns - last_print_ns > PROGRESS_INTERVAL_NS or completed == total_requests:
+                last_print_ns = now_ns
+                print(f"   进度: {completed}/{total_requests} ({(completed/total_requests*100):.1f}%)", end='\r')
+            return result
+        
+        start_time = loop.time()
+        results = await asyncio.gather(*(run_one(func) for func in request_funcs))
+        total_time = loop.time() - start_time
+        
+        return list(results), total_time
+    
+    async def _run_sustained(self, concurrent_count, duration_seconds):
+        """持续发送请求直到截止时间，返回 (结果, 总耗时)"""
+        loop = asyncio.get_running_loop()
+        # 每个工作协程写入各自的结果列表，结束后再合并
+        buckets = [[] for _ in range(concurrent_count)]
+        
+        client = await self._get_async_client(concurrent_count)
+        
+        # 到达测试时长后由定时器设置停止标志
+        stop = asyncio.Event()
+        start_time = loop.time()
+        loop.call_later(duration_seconds, stop.set)
+        
+        async def worker(bucket):
+            while not stop.is_set():
+                bucket.append(await self._single_request_file_async(client))
+        
+        workers = [asyncio.create_task(worker(bucket)) for bucket in buckets]
+        
+        # 监控进度，停止标志设置后立即结束
+        while not stop.is_set():
+            elapsed = loop.time() - start_time
+            completed = sum(len(bucket) for bucket in buckets)
+            print(f"   运行中: {elapsed:.1f}s / {duration_seconds}s, 已完成: {completed} 请求", end='\r')
+            try:
+                await asyncio.wait_for(stop.wait(), timeout=1)
+            except asyncio.TimeoutError:
+                pass
+        
+        # 等待所有协程完成
+        await asyncio.gather(*workers)
+        total_time = loop.time() - start_time
+        
+        return list(itertools.chain.from_iterable(buckets)), total_time
+    
+    def warmup(self, warmup_count=10):
         """预热测试"""
         print(f"🔥 预热测试 ({warmup_count} 次请求)...")
+        self._ensure_payloads()
         for i in range(warmup_count):
-            self.single_request_file(image_data)
+            self.single_request_file()
             print(f"   预热进度: {i+1}/{warmup_count}", end='\r')
         print("✅ 预热完成" + " " * 20)
     
-    def benchmark_sequential(self, image_data, request_count=50):
+    def benchmark_sequential(self, request_count=50):
         """串行基准测试"""
         print(f"\n📊 串行基准测试 ({request_count} 次请求)")
         print("-" * 60)
+        self._ensure_payloads()
         
         results = []
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        last_print_ns = 0
         
         for i in range(request_count):
-            result = self.single_request_file(image_data)
+            result = self.single_request_file()
             results.append(result)
-            print(f"   进度: {i+1}/{request_count} ({((i+1)/request_count*100):.1f}%)", end='\r')
+            now_ns = time.perf_counter_ns()
+            if now_ns - last_print_ns > PROGRESS_INTERVAL_NS or i + 1 == request_count:
+                last_print_ns = now_ns
+                print(f"   进度: {i+1}/{request_count} ({((i+1)/request_count*100):.1f}%)", end='\r')
         
-        total_time = time.time() - start_time
+        total_time = elapsed_ms(start_ns) / 1000
         self.print_results("串行测试", results, total_time)
         return results
     
-    def benchmark_concurrent(self, image_data, concurrent_count=10, total_requests=100):
+    def benchmark_concurrent(self, concurrent_count=10, total_requests=100):
         """并发压力测试"""
         print(f"\n🚀 并发压力测试 ({concurrent_count} 并发, {total_requests} 总请求)")
         print("-" * 60)
+        self._ensure_payloads()
         
-        results = []
-        start_time = time.time()
+        request_funcs = [self._single_request_file_async] * total_requests
         
-        with ThreadPoolExecutor(max_workers=concurrent_count) as executor:
-            # 提交所有任务
-            futures = [executor.submit(self.single_request_file, image_data) 
-                      for _ in range(total_requests)]
-            
-            # 收集结果
-            completed = 0
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
-                completed += 1
-                print(f"   进度: {completed}/{total_requests} ({(completed/total_requests*100):.1f}%)", end='\r')
-        
-        total_time = time.time() - start_time
+        results, total_time = self._run_async(self._run_concurrent(request_funcs, concurrent_count))
         self.print_results(f"并发测试 ({concurrent_count}并发)", results, total_time)
         return results
     
-    def benchmark_mixed_api(self, image_data, concurrent_count=10, total_requests=100):
+    def benchmark_mixed_api(self, concurrent_count=10, total_requests=100):
         """混合API测试（文件上传 + Base64）"""
         print(f"\n🔀 混合API测试 ({concurrent_count} 并发, {total_requests} 总请求)")
         print("-" * 60)
+        self._ensure_payloads()
         
-        results = []
-        start_time = time.time()
-        
-        with ThreadPoolExecutor(max_workers=concurrent_count) as executor:
-            futures = []
-            # 交替使用文件上传和Base64 API
-            for i in range(total_requests):
-                if i % 2 == 0:
-                    futures.append(executor.submit(self.single_request_file, image_data))
-                else:
-                    futures.append(executor.submit(self.single_request_base64, image_data))
-            
-            completed = 0
-            for future in as_completed(futures):
-                result = future.result()
-                results.append(result)
-                completed += 1
-                print(f"   进度: {completed}/{total_requests} ({(completed/total_requests*100):.1f}%)", end='\r')
+        request_funcs = []
+        # 交替使用文件上传和Base64 API
+        for i in range(total_requests):
+            if i % 2 == 0:
+                request_funcs.append(self._single_request_file_async)
+            else:
+                request_funcs.append(self._single_request_base64_async)
         
-        total_time = time.time() - start_time
+        results, total_time = self._run_async(self._run_concurrent(request_funcs, concurrent_count))
         self.print_results("混合API测试", results, total_time)
         return results
     
-    def sustained_load_test(self, image_data, concurrent_count=5, duration_seconds=30):
+    def sustained_load_test(self, concurrent_count=5, duration_seconds=30):
         """持续负载测试"""
         print(f"\n⏱️  持续负载测试 ({concurrent_count} 并发, {duration_seconds} 秒)")
         print("-" * 60)
+        self._ensure_payloads()
         
-        results = []
-        start_time = time.time()
-        end_time = start_time + duration_seconds
-        
-        def worker():
-            while time.time() < end_time:
-                result = self.single_request_file(image_data)
-                results.append(result)
-        
-        threads = []
-        for _ in range(concurrent_count):
-            thread = threading.Thread(target=worker)
-            threads.append(thread)
-            thread.start()
-        
-        # 监控进度
-        while time.time() < end_time:
-            elapsed = time.time() - start_time
-            remaining = duration_seconds - elapsed
-            print(f"   运行中: {elapsed:.1f}s / {duration_seconds}s, 已完成: {len(results)} 请求", end='\r')
-            time.sleep(1)
-        
-        # 等待所有线程完成
-        for thread in threads:
-            thread.join()
-        
-        total_time = time.time() - start_time
+        results, total_time = self._run_async(
+            self._run_sustained(concurrent_count, duration_seconds))
         self.print_results("持续负载测试", results, total_time)
         return results
     
@@ -249,12 +453,21 @@ class QRCodeBenchmark:
             print(f"❌ {test_name}: 所有请求都失败了!")
             return
         
-        # 计算统计数据
-        client_times = [r['total_time'] for r in successful_results]
-        server_times = [r['server_stats'].get('total_time_ms', 0) for r in successful_results if 'server_stats' in r]
-        decode_times = [r['server_stats'].get('image_decode_time_ms', 0) for r in successful_results if 'server_stats' in r]
-        detection_times = [r['server_stats'].get('detection_time_ms', 0) for r in successful_results if 'server_stats' in r]
-        pool_times = [r['server_stats'].get('pool_acquisition_time_ms', 0) for r in successful_results if 'server_stats' in r]
+        # 计算统计数据：一次遍历填充结构化数组，缺失字段记为 NaN
+        nan = float('nan')
+        metrics = np.fromiter(
+            ((r['total_time'],
+              r['server_stats'].get('total_time_ms', 0),
+              r['server_stats'].get('image_decode_time_ms', 0),
+              r['server_stats'].get('detection_time_ms', 0),
+              r['server_stats'].get('pool_acquisition_time_ms', 0),
+              r.get('prepare_time', nan),
+              r.get('request_time', nan),
+              r.get('parse_time', nan),
+              r.get('response_size', nan))
+             for r in successful_results),
+            dtype=METRICS_DTYPE, count=len(successful_results))
+        client_times = np.sort(metrics['client'])
         
         qps = len(successful_results) / total_time if total_time > 0 else 0
         
@@ -265,41 +478,36 @@ class QRCodeBenchmark:
         print(f"   总耗时: {total_time:.2f}s")
         print(f"   QPS: {qps:.2f}")
         
-        if client_times:
-            print(f"\n   客户端响应时间 (ms):")
-            print(f"     平均: {statistics.mean(client_times):.2f}")
-            print(f"     中位数: {statistics.median(client_times):.2f}")
-            print(f"     最小: {min(client_times):.2f}")
-            print(f"     最大: {max(client_times):.2f}")
-            print(f"     95%: {self.percentile(client_times, 95):.2f}")
-            print(f"     99%: {self.percentile(client_times, 99):.2f}")
-            
-            # 详细时间分解
-            prepare_times = [r.get('prepare_time', 0) for r in successful_results if 'prepare_time' in r]
-            request_times = [r.get('request_time', 0) for r in successful_results if 'request_time' in r]
-            parse_times = [r.get('parse_time', 0) for r in successful_results if 'parse_time' in r]
-            response_sizes = [r.get('response_size', 0) for r in successful_results if 'response_size' in r]
+        # client_times 已排序，直接按下标取值
+        size = client_times.size
+        print(f"\n   客户端响应时间 (ms):")
+        print(f"     平均: {client_times.mean():.2f}")
+        print(f"     中位数: {(client_times[(size - 1) // 2] + client_times[size // 2]) / 2:.2f}")
+        print(f"     最小: {client_times[0]:.2f}")
+        print(f"     最大: {client_times[-1]:.2f}")
+        print(f"     95%: {self.percentile(client_times, 95):.2f}")
+        print(f"     99%: {self.percentile(client_times, 99):.2f}")
+        
+        # 详细时间分解（Base64请求没有分阶段计时）
+        phases = ~np.isnan(metrics['request'])
+        if phases.any():
+            request_avg = metrics['request'][phases].mean()
+            print(f"\n   时间分解分析 (ms):")
+            print(f"     请求准备时间: {metrics['prepare'][phases].mean():.3f}")
+            print(f"     网络+服务器时间: {request_avg:.2f}")
+            print(f"     响应解析时间: {metrics['parse'][phases].mean():.3f}")
             
-            if prepare_times and request_times and parse_times:
-                print(f"\n   时间分解分析 (ms):")
-                print(f"     请求准备时间: {statistics.mean(prepare_times):.3f}")
-                print(f"     网络+服务器时间: {statistics.mean(request_times):.2f}")
-                print(f"     响应解析时间: {statistics.mean(parse_times):.3f}")
-                
-                # 计算网络开销
-                network_overhead = statistics.mean(request_times) - statistics.mean(server_times) if server_times else 0
-                print(f"     网络+HTTP开销: {network_overhead:.2f}")
-                
-            if response_sizes:
-                print(f"     平均响应大小: {statistics.mean(response_sizes):.0f} bytes")
-        
-        if server_times:
-            print(f"\n   服务端处理时间 (ms):")
-            print(f"     总时间平均: {statistics.mean(server_times):.2f}")
-            print(f"     解码时间平均: {statistics.mean(decode_times):.2f}")
-            print(f"     检测时间平均: {statistics.mean(detection_times):.2f}")
-            if pool_times and any(t > 0 for t in pool_times):
-                print(f"     对象池获取时间平均: {statistics.mean(pool_times):.3f}")
+            # 计算网络开销
+            network_overhead = request_avg - metrics['server'].mean()
+            print(f"     网络+HTTP开销: {network_overhead:.2f}")
+            print(f"     平均响应大小: {metrics['respsize'][phases].mean():.0f} bytes")
+        
+        print(f"\n   服务端处理时间 (ms):")
+        print(f"     总时间平均: {metrics['server'].mean():.2f}")
+        print(f"     解码时间平均: {metrics['decode'].mean():.2f}")
+        print(f"     检测时间平均: {metrics['detect'].mean():.2f}")
+        if (metrics['pool'] > 0).any():
+            print(f"     对象池获取时间平均: {metrics['pool'].mean():.3f}")
         
         if failed_count > 0:
             print(f"\n   ⚠️  失败原因统计:")
@@ -311,10 +519,10 @@ class QRCodeBenchmark:
             for error, count in error_counts.items():
                 print(f"     {error}: {count}")
     
-    def percentile(self, data, percentile):
-        """计算百分位数"""
-        size = len(data)
-        return sorted(data)[int(size * percentile / 100)]
+    def percentile(self, sorted_data, percentile):
+        """计算百分位数（输入需已排序）"""
+        size = len(sorted_data)
+        return sorted_data[int(size * percentile / 100)]
     
     def run_all_benchmarks(self):
         """运行所有基准测试"""
@@ -334,15 +542,18 @@ class QRCodeBenchmark:
         print(f"📸 测试图片大小: {len(image_data)} bytes")
         
         # 预热
-        self.warmup(image_data)
+        self.warmup()
         
         # 各种基准测试
-        self.benchmark_sequential(image_data, 20)
-        self.benchmark_concurrent(image_data, 5, 50)
-        self.benchmark_concurrent(image_data, 10, 100)
-        self.benchmark_concurrent(image_data, 20, 200)
-        self.benchmark_mixed_api(image_data, 10, 100)
-        self.sustained_load_test(image_data, 10, 20)
+        try:
+            self.benchmark_sequential(20)
+            self.benchmark_concurrent(5, 50)
+            self.benchmark_concurrent(10, 100)
+            self.benchmark_concurrent(20, 200)
+            self.benchmark_mixed_api(10, 100)
+            self.sustained_load_test(10, 20)
+        finally:
+            self.close()
         
         print("\n" + "=" * 80)
         print("✨ 所有基准测试完成!")
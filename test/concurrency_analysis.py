@@ -1,11 +1,25 @@
 #!/usr/bin/env python3
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
 import threading
 import statistics
 from concurrent.futures import ThreadPoolExecutor
 
+_local = threading.local()
+
+def get_session():
+    """获取当前线程的HTTP会话，复用 keep-alive 连接"""
+    session = getattr(_local, 'session', None)
+    if session is None:
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=1, max_retries=0)
+        session.mount('http://', adapter)
+        session.headers['Connection'] = 'keep-alive'
+        _local.session = session
+    return session
+
 def test_concurrency_impact():
     """测试并发对响应时间的影响"""
     print("🔬 并发对响应时间影响分析")
@@ -15,10 +29,10 @@ def test_concurrency_impact():
         image_data = f.read()
     
     def single_request():
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         files = {'file': ('test.png', image_data, 'image/png')}
-        response = requests.post("http://localhost:3000/detect/file", files=files)
-        client_time = (time.time() - start_time) * 1000
+        response = get_session().post("http://localhost:3000/detect/file", files=files)
+        client_time = (time.perf_counter_ns() - start_ns) / 1_000_000
         
         data = response.json()
         server_time = data.get('statistics', {}).get('total_time_ms', 0)
@@ -37,14 +51,14 @@ def test_concurrency_impact():
         print("-" * 40)
         
         results = []
-        start_time = time.time()
+        start_time = time.perf_counter()
         
         with ThreadPoolExecutor(max_workers=concurrency) as executor:
             futures = [executor.submit(single_request) for _ in range(concurrency * 3)]
             for future in futures:
                 results.append(future.result())
         
-        total_time = time.time() - start_time
+        total_time = time.perf_counter() - start_time
         
         client_times = [r['client_time'] for r in results]
         server_times = [r['server_time'] for r in results]
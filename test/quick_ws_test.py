@@ -6,15 +6,21 @@ Quick WebSocket Performance Test
 
 import asyncio
 import websockets
-import json
+import orjson
 import time
 import random
 import string
-import base64
 import io
 import qrcode
 from PIL import Image
 
+# 预生成的二维码数量
+QR_POOL_SIZE = 256
+# 单连接上允许的最大在途请求数
+PIPELINE_DEPTH = 8
+# 固定的关闭消息，预先序列化（文本帧；二进制帧会被服务器当作图片）
+_CLOSE_FRAME = '{"type":"close"}'
+
 async def quick_test(duration=10):
     """快速性能测试"""
     # 生成测试二维码
@@ -28,50 +34,77 @@ async def quick_test(duration=10):
         
         buffer = io.BytesIO()
         img.save(buffer, format='PNG')
-        return text, base64.b64encode(buffer.getvalue()).decode()
+        return text, buffer.getvalue()
     
     print(f"🚀 Quick WebSocket FPS Test ({duration}s)")
     print("=" * 40)
     
+    # 预生成二维码，计时循环中只做网络收发
+    # PNG 字节直接作为二进制帧发送，服务器按原始图片检测，省去 base64/JSON/UTF-8 编码
+    qr_pool = [generate_test_qr() for _ in range(QR_POOL_SIZE)]
+    print(f"✅ Generated {QR_POOL_SIZE} QR codes")
+    
     uri = "ws://localhost:3000/ws"
     sent = 0
     received = 0
     correct = 0
-    start_time = time.time()
     
     try:
-        async with websockets.connect(uri) as websocket:
+        # 关闭心跳和 permessage-deflate：PNG 已经过压缩，再压缩只消耗CPU
+        async with websockets.connect(uri, ping_interval=None, ping_timeout=None,
+                                      max_size=2**20, compression=None) as websocket:
             # 接收欢迎消息
             await websocket.recv()
             print("✅ Connected")
             
-            while time.time() - start_time < duration:
-                # 生成并发送二维码
-                expected_text, qr_b64 = generate_test_qr()
-                
-                message = {"type": "detect", "image": qr_b64}
-                await websocket.send(json.dumps(message))
-                sent += 1
-                
-                # 接收响应
-                response = await websocket.recv()
-                received += 1
-                
-                result = json.loads(response)
-                if result.get('success') and result.get('qrcodes'):
-                    detected_texts = [qr.get('text', '') for qr in result['qrcodes']]
-                    if expected_text in detected_texts:
-                        correct += 1
-                
-                # 每100次显示进度
-                if sent % 100 == 0:
-                    elapsed = time.time() - start_time
-                    fps = sent / elapsed
-                    accuracy = (correct / received * 100) if received > 0 else 0
-                    print(f"📊 {sent:4d} sent | {fps:5.1f} FPS | {accuracy:5.1f}% accuracy")
+            start_time = time.perf_counter()
+            deadline = time.monotonic() + duration
+            # 限制在途请求数；服务器按顺序响应，期望文本按发送顺序入队匹配
+            window = asyncio.Semaphore(PIPELINE_DEPTH)
+            pending = asyncio.Queue()
+            
+            async def producer():
+                nonlocal sent
+                while time.monotonic() < deadline:
+                    await window.acquire()
+                    # 发送预生成的二维码
+                    expected_text, png_bytes = qr_pool[sent % QR_POOL_SIZE]
+                    pending.put_nowait(expected_text)
+                    await websocket.send(png_bytes)
+                    sent += 1
+                pending.put_nowait(None)
+            
+            async def consumer():
+                nonlocal received, correct
+                while (expected_text := await pending.get()) is not None:
+                    # 接收响应（decode=False 直接返回 bytes，跳过 UTF-8 解码校验）
+                    response = await websocket.recv(decode=False)
+                    window.release()
+                    received += 1
+                    
+                    result = orjson.loads(response)
+                    if result.get('success') and result.get('qrcodes'):
+                        if any(qr.get('text') == expected_text for qr in result['qrcodes']):
+                            correct += 1
+                    
+                    # 每100次显示进度
+                    if received % 100 == 0:
+                        elapsed = time.perf_counter() - start_time
+                        fps = sent / elapsed
+                        accuracy = correct / received * 100
+                        print(f"📊 {sent:4d} sent | {fps:5.1f} FPS | {accuracy:5.1f}% accuracy")
+            
+            tasks = [asyncio.create_task(producer()), asyncio.create_task(consumer())]
+            try:
+                await asyncio.gather(*tasks)
+            finally:
+                # 任一端出错时取消另一端，避免发送端阻塞在信号量上遗留任务
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
             
             # 关闭连接
-            await websocket.send(json.dumps({"type": "close"}))
+            await websocket.send(_CLOSE_FRAME)
             await websocket.recv()
             
     except Exception as e:
@@ -79,7 +112,7 @@ async def quick_test(duration=10):
         return
     
     # 统计结果
-    elapsed = time.time() - start_time
+    elapsed = time.perf_counter() - start_time
     fps = sent / elapsed
     accuracy = (correct / received * 100) if received > 0 else 0
     
@@ -92,4 +125,10 @@ async def quick_test(duration=10):
     print(f"   Correct: {correct}/{received}")
 
 if __name__ == "__main__":
-    asyncio.run(quick_test())
+    try:
+        import uvloop
+    except ImportError:
+        # 未安装 uvloop（如 Windows）时使用默认事件循环
+        asyncio.run(quick_test())
+    else:
+        uvloop.run(quick_test())
@@ -2,6 +2,7 @@
 
 import requests
 import json
+import numpy as np
 
 def test_corner_points():
     """测试角点定位准确性"""
@@ -17,14 +18,15 @@ def test_corner_points():
     
     if data['success'] and data['qrcodes']:
         qr = data['qrcodes'][0]
+        pts = np.asarray(qr['points'], dtype=np.float64)
         
         print(f"📸 图片尺寸: {data['statistics']['image_width']} x {data['statistics']['image_height']}")
         print(f"🔍 检测到的QR码: {qr['text']}")
         print()
         
         print("📍 角点坐标:")
-        for i, point in enumerate(qr['points']):
-            print(f"  角点 {i+1}: ({point[0]:.2f}, {point[1]:.2f})")
+        for i, (x, y) in enumerate(pts):
+            print(f"  角点 {i+1}: ({x:.2f}, {y:.2f})")
         
         print()
         print("📐 边界框:")
@@ -42,14 +44,12 @@ def test_corner_points():
         img_height = data['statistics']['image_height']
         
         # 检查所有角点是否在图像范围内
-        all_in_bounds = True
-        for i, point in enumerate(qr['points']):
-            x, y = point
-            if x < 0 or x > img_width or y < 0 or y > img_height:
-                print(f"  ❌ 角点 {i+1} 超出图像边界")
-                all_in_bounds = False
+        in_bounds = ((pts[:, 0] >= 0) & (pts[:, 0] <= img_width) &
+                     (pts[:, 1] >= 0) & (pts[:, 1] <= img_height))
+        for i in np.flatnonzero(~in_bounds):
+            print(f"  ❌ 角点 {i+1} 超出图像边界")
         
-        if all_in_bounds:
+        if in_bounds.all():
             print("  ✅ 所有角点都在图像范围内")
         
         # 检查QR码尺寸合理性
@@ -69,17 +69,11 @@ def test_corner_points():
         print("🔄 角点顺序分析:")
         
         # 计算质心
-        center_x = sum(p[0] for p in qr['points']) / 4
-        center_y = sum(p[1] for p in qr['points']) / 4
+        center_x, center_y = pts.mean(axis=0)
         print(f"  质心: ({center_x:.2f}, {center_y:.2f})")
         
         # 计算每个角点相对于质心的角度
-        import math
-        angles = []
-        for point in qr['points']:
-            x, y = point
-            angle = math.atan2(y - center_y, x - center_x)
-            angles.append(math.degrees(angle))
+        angles = np.degrees(np.arctan2(pts[:, 1] - center_y, pts[:, 0] - center_x))
         
         print("  角点角度:")
         for i, angle in enumerate(angles):
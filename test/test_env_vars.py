@@ -8,13 +8,16 @@ import requests
 import json
 import time
 
+# 所有配置检查共享同一会话，复用已建立的连接
+session = requests.Session()
+
 def test_config(port, context_path, expected_initial, expected_max):
     """测试特定配置"""
     try:
         health_url = f"http://localhost:{port}{context_path}/health"
         print(f"🔍 Testing: {health_url}")
         
-        response = requests.get(health_url, timeout=5)
+        response = session.get(health_url, timeout=5)
         if response.status_code == 200:
             data = response.json()
             pool_stats = data.get('pool_stats', {})
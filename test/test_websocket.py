@@ -7,52 +7,56 @@ WebSocket QR Code Detection Test Script
 import asyncio
 import websockets
 import base64
-import json
+import orjson
 import time
 import os
 from pathlib import Path
 
+# 单连接上允许的最大在途请求数
+PIPELINE_DEPTH = 8
+# 关闭 permessage-deflate（base64 图片几乎不可压缩，压缩只消耗CPU）
+CONNECT_OPTIONS = {'compression': None}
+
+def _dumps(obj):
+    """用 orjson 序列化为文本帧（服务器将二进制帧当作原始图片处理）"""
+    return orjson.dumps(obj).decode()
+
+_loads = orjson.loads
+
+# 固定的控制消息，预先序列化（文本帧；二进制帧会被服务器当作图片）
+_CLOSE_FRAME = '{"type":"close"}'
+_END_FRAME = '{"end":true}'
+
+# 测试用小图片的 base64（已去除空白）；实际使用时可以替换为真实的QR码图片
+_TEST_IMAGE_B64 = "iVBORw0KGgoAAAANSUhEUgAAAAoAAAAKCAYAAACNMs+9AAAAFklEQVR42mNk+M/AAEIQCFg4zQjEgAAAVgAKpMUj8wAAAABJRU5ErkJggg=="
+
 class QRCodeWebSocketTester:
-    def __init__(self, server_url="ws://localhost:3000/ws"):
+    def __init__(self, server_url="ws://localhost:3000/ws", throttle=0):
         self.server_url = server_url
-        self.test_images = []
-        self.load_test_images()
-
-    def load_test_images(self):
-        """加载测试图片"""
-        # 简单生成一个测试QR码的base64字符串
-        # 这里使用一个包含简单QR码的小图片的base64
-        # 实际使用时可以替换为真实的QR码图片
-        test_qr_base64 = """
-        iVBORw0KGgoAAAANSUhEUgAAAAoAAAAKCAYAAACNMs+9AAAAFklEQVR42mNk+M/AAEIQCFg4zQjEgAAA
-        VgAKpMUj8wAAAABJRU5ErkJggg==
-        """
-        self.test_images.append(test_qr_base64.replace('\n', '').replace(' ', ''))
+        # 多图测试中每次请求后的间隔（秒），0 表示不延迟
+        self.throttle = throttle
+        # 预先序列化检测消息，发送循环中直接复用
+        self.test_frame = _dumps({"type": "detect", "image": _TEST_IMAGE_B64})
 
     async def test_single_image(self):
         """测试发送单张图片"""
         print("🔍 Testing single image detection...")
         
         try:
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 print(f"✅ Connected to {self.server_url}")
                 
                 # 发送图片
-                message = {
-                    "type": "detect",
-                    "image": self.test_images[0]
-                }
-                await websocket.send(json.dumps(message))
+                await websocket.send(self.test_frame)
                 print("📤 Sent image data")
                 
                 # 接收响应
                 response = await websocket.recv()
-                result = json.loads(response)
+                result = _loads(response)
                 print(f"📥 Received response: {result}")
                 
                 # 发送结束消息
-                end_message = {"type": "close"}
-                await websocket.send(json.dumps(end_message))
+                await websocket.send(_CLOSE_FRAME)
                 print("🔚 Sent end message")
                 
         except Exception as e:
@@ -63,29 +67,25 @@ class QRCodeWebSocketTester:
         print(f"🔍 Testing multiple images detection ({count} images)...")
         
         try:
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 print(f"✅ Connected to {self.server_url}")
                 
                 # 发送多张图片
                 for i in range(count):
-                    message = {
-                        "type": "detect",
-                        "image": self.test_images[0]  # 使用相同的测试图片
-                    }
-                    await websocket.send(json.dumps(message))
+                    await websocket.send(self.test_frame)  # 使用相同的测试图片
                     print(f"📤 Sent image {i+1}/{count}")
                     
                     # 接收响应
                     response = await websocket.recv()
-                    result = json.loads(response)
+                    result = _loads(response)
                     print(f"📥 Response {i+1}: {result}")
                     
-                    # 短暂延迟
-                    await asyncio.sleep(0.1)
+                    # 按需限速
+                    if self.throttle:
+                        await asyncio.sleep(self.throttle)
                 
                 # 发送结束消息
-                end_message = {"type": "close"}
-                await websocket.send(json.dumps(end_message))
+                await websocket.send(_CLOSE_FRAME)
                 print("🔚 Sent end message")
                 
         except Exception as e:
@@ -95,44 +95,60 @@ class QRCodeWebSocketTester:
         """性能测试 - 在指定时间内持续发送图片"""
         print(f"🚀 Performance test for {duration} seconds...")
         
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        deadline_ns = start_ns + duration * 1_000_000_000
         image_count = 0
         success_count = 0
         
         try:
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 print(f"✅ Connected to {self.server_url}")
                 
-                while time.time() - start_time < duration:
-                    try:
+                # 发送和接收并行进行，限制在途请求数；发送结束后以 None 通知接收端
+                window = asyncio.Semaphore(PIPELINE_DEPTH)
+                pending = asyncio.Queue()
+                
+                async def sender():
+                    nonlocal image_count
+                    while time.perf_counter_ns() < deadline_ns:
+                        await window.acquire()
                         # 发送图片
-                        message = {
-                            "image": self.test_images[0]
-                        }
-                        await websocket.send(json.dumps(message))
+                        pending.put_nowait(True)
+                        await websocket.send(self.test_frame)
                         image_count += 1
-                        
-                        # 接收响应
-                        response = await websocket.recv()
-                        result = json.loads(response)
+                    pending.put_nowait(None)
+                
+                async def receiver():
+                    nonlocal success_count
+                    while await pending.get() is not None:
+                        # 接收响应（以 bytes 接收，交给 orjson 解析）
+                        response = await websocket.recv(decode=False)
+                        window.release()
+                        result = _loads(response)
                         success_count += 1
                         
                         # 显示进度
-                        if image_count % 10 == 0:
-                            elapsed = time.time() - start_time
+                        if success_count % 10 == 0:
+                            elapsed = (time.perf_counter_ns() - start_ns) / 1_000_000_000
                             rate = image_count / elapsed
-                            print(f"📊 Processed {image_count} images, rate: {rate:.1f} img/s")
-                        
-                    except Exception as e:
-                        print(f"❌ Error during performance test: {e}")
-                        break
+                            print(f"📊 Processed {success_count} images, rate: {rate:.1f} img/s")
+                
+                tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+                try:
+                    await asyncio.gather(*tasks)
+                except Exception as e:
+                    print(f"❌ Error during performance test: {e}")
+                finally:
+                    # 任一端出错时取消另一端，并等待取消完成，避免遗留任务
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
                 
                 # 发送结束消息
-                end_message = {"end": True}
-                await websocket.send(json.dumps(end_message))
+                await websocket.send(_END_FRAME)
                 
                 # 计算统计信息
-                elapsed_time = time.time() - start_time
+                elapsed_time = (time.perf_counter_ns() - start_ns) / 1_000_000_000
                 success_rate = success_count / image_count * 100 if image_count > 0 else 0
                 avg_rate = image_count / elapsed_time
                 
@@ -152,7 +168,7 @@ class QRCodeWebSocketTester:
         
         try:
             # 测试正常连接和断开
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 print("✅ Connected successfully")
                 
                 # 测试ping
@@ -160,14 +176,12 @@ class QRCodeWebSocketTester:
                 print("🏓 Ping successful")
                 
                 # 发送一条消息
-                message = {"image": self.test_images[0]}
-                await websocket.send(json.dumps(message))
+                await websocket.send(self.test_frame)
                 response = await websocket.recv()
                 print("📤📥 Message exchange successful")
                 
                 # 正常关闭
-                end_message = {"end": True}
-                await websocket.send(json.dumps(end_message))
+                await websocket.send(_END_FRAME)
                 print("🔚 Normal closure successful")
                 
         except Exception as e:
@@ -178,7 +192,7 @@ class QRCodeWebSocketTester:
         print("🚨 Testing invalid data handling...")
         
         try:
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 print("✅ Connected")
                 
                 # 测试无效JSON
@@ -191,7 +205,7 @@ class QRCodeWebSocketTester:
                 
                 # 测试缺少字段的JSON
                 try:
-                    await websocket.send(json.dumps({"wrong_field": "value"}))
+                    await websocket.send(_dumps({"wrong_field": "value"}))
                     response = await websocket.recv()
                     print(f"📥 Response to wrong field: {response}")
                 except Exception as e:
@@ -199,15 +213,14 @@ class QRCodeWebSocketTester:
                 
                 # 测试无效base64
                 try:
-                    await websocket.send(json.dumps({"image": "invalid_base64"}))
+                    await websocket.send(_dumps({"image": "invalid_base64"}))
                     response = await websocket.recv()
                     print(f"📥 Response to invalid base64: {response}")
                 except Exception as e:
                     print(f"⚠️ Invalid base64 handled: {e}")
                 
                 # 正常结束
-                end_message = {"end": True}
-                await websocket.send(json.dumps(end_message))
+                await websocket.send(_END_FRAME)
                 
         except Exception as e:
             print(f"❌ Error in invalid data test: {e}")
@@ -248,4 +261,10 @@ async def main():
         print(f"❌ Test suite error: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        # 未安装 uvloop（如 Windows）时使用默认事件循环
+        asyncio.run(main())
+    else:
+        uvloop.run(main())
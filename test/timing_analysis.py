@@ -2,9 +2,30 @@
 # -*- coding: utf-8 -*-
 
 import requests
+from requests.adapters import HTTPAdapter
 import time
-import statistics
 import json
+import numpy as np
+
+# 测试次数
+TEST_COUNT = 10
+# 每次测试记录的指标（列顺序与结果数组一致）
+METRICS = [
+    ('客户端总时间', 'total_client_time'),
+    ('请求准备时间', 'prepare_time'),
+    ('网络+服务器时间', 'request_time'),
+    ('响应解析时间', 'parse_time'),
+    ('服务器总时间', 'server_total_time'),
+    ('服务器解码时间', 'server_decode_time'),
+    ('服务器检测时间', 'server_detection_time'),
+    ('对象池获取时间', 'server_pool_time'),
+    ('响应大小', 'response_size'),
+]
+COLUMN = {key: i for i, (_, key) in enumerate(METRICS)}
+
+def elapsed_ms(start_ns):
+    """计算自 perf_counter_ns 起点以来经过的毫秒数"""
+    return (time.perf_counter_ns() - start_ns) / 1_000_000
 
 def detailed_timing_analysis():
     """详细的时间分析"""
@@ -15,73 +36,70 @@ def detailed_timing_analysis():
     with open("test_qr.png", 'rb') as f:
         image_data = f.read()
     
-    results = []
+    # 复用同一个会话（keep-alive），先建立连接，使测得的网络开销不含TCP建连
+    session = requests.Session()
+    session.mount('http://', HTTPAdapter(pool_connections=1, pool_maxsize=1))
+    session.get("http://localhost:3000/health")
+    
+    # 每行一次测试，每列一个指标
+    results = np.empty((TEST_COUNT, len(METRICS)), dtype=np.float64)
     
     # 进行10次测试
-    for i in range(10):
-        print(f"测试 {i+1}/10...", end=' ')
+    for i in range(TEST_COUNT):
+        print(f"测试 {i+1}/{TEST_COUNT}...", end=' ')
         
         # 详细计时
-        total_start = time.time()
+        total_start = time.perf_counter_ns()
         
         # 1. 准备请求
-        prepare_start = time.time()
+        prepare_start = time.perf_counter_ns()
         files = {'file': ('test.png', image_data, 'image/png')}
-        prepare_time = (time.time() - prepare_start) * 1000
+        prepare_time = elapsed_ms(prepare_start)
         
         # 2. 发送请求和接收响应
-        request_start = time.time()
-        response = requests.post("http://localhost:3000/detect/file", files=files)
-        request_time = (time.time() - request_start) * 1000
+        request_start = time.perf_counter_ns()
+        response = session.post("http://localhost:3000/detect/file", files=files)
+        request_time = elapsed_ms(request_start)
         
         # 3. 解析响应
-        parse_start = time.time()
+        parse_start = time.perf_counter_ns()
         data = response.json()
-        parse_time = (time.time() - parse_start) * 1000
+        parse_time = elapsed_ms(parse_start)
         
-        total_time = (time.time() - total_start) * 1000
+        total_time = elapsed_ms(total_start)
         
         server_stats = data.get('statistics', {})
-        
-        result = {
-            'total_client_time': total_time,
-            'prepare_time': prepare_time,
-            'request_time': request_time, 
-            'parse_time': parse_time,
-            'server_total_time': server_stats.get('total_time_ms', 0),
-            'server_decode_time': server_stats.get('image_decode_time_ms', 0),
-            'server_detection_time': server_stats.get('detection_time_ms', 0),
-            'server_pool_time': server_stats.get('pool_acquisition_time_ms', 0),
-            'response_size': len(response.content)
-        }
-        
-        results.append(result)
-        print(f"总时间: {total_time:.1f}ms, 服务器: {result['server_total_time']:.1f}ms")
+        server_total_time = server_stats.get('total_time_ms', 0)
+        results[i] = (
+            total_time,
+            prepare_time,
+            request_time,
+            parse_time,
+            server_total_time,
+            server_stats.get('image_decode_time_ms', 0),
+            server_stats.get('detection_time_ms', 0),
+            server_stats.get('pool_acquisition_time_ms', 0),
+            len(response.content),
+        )
+        print(f"总时间: {total_time:.1f}ms, 服务器: {server_total_time:.1f}ms")
     
     # 统计分析
     print("\n📊 时间分解统计:")
     print("-" * 50)
     
-    metrics = [
-        ('客户端总时间', 'total_client_time'),
-        ('请求准备时间', 'prepare_time'), 
-        ('网络+服务器时间', 'request_time'),
-        ('响应解析时间', 'parse_time'),
-        ('服务器总时间', 'server_total_time'),
-        ('服务器解码时间', 'server_decode_time'),
-        ('服务器检测时间', 'server_detection_time'),
-        ('对象池获取时间', 'server_pool_time')
-    ]
+    # 一次性按列求均值和分位数
+    means = results.mean(axis=0)
+    has_values = (results > 0).any(axis=0)
+    p50, p95, p99 = np.percentile(results, [50, 95, 99], axis=0)
     
-    for name, key in metrics:
-        values = [r[key] for r in results]
-        if any(v > 0 for v in values):
-            avg = statistics.mean(values)
-            print(f"{name:15}: {avg:8.3f}ms")
+    for name, key in METRICS[:-1]:
+        col = COLUMN[key]
+        if has_values[col]:
+            print(f"{name:15}: {means[col]:8.3f}ms  (P50 {p50[col]:.3f} / P95 {p95[col]:.3f} / P99 {p99[col]:.3f})")
     
     # 计算网络开销
-    client_request_avg = statistics.mean([r['request_time'] for r in results])
-    server_total_avg = statistics.mean([r['server_total_time'] for r in results])
+    client_request_avg = means[COLUMN['request_time']]
+    server_total_avg = means[COLUMN['server_total_time']]
     network_overhead = client_request_avg - server_total_avg
     
     print(f"\n🌐 网络+HTTP开销分析:")
@@ -90,7 +108,7 @@ def detailed_timing_analysis():
     print(f"网络+HTTP开销:    {network_overhead:.2f}ms ({network_overhead/client_request_avg*100:.1f}%)")
     
     # 响应大小
-    avg_response_size = statistics.mean([r['response_size'] for r in results])
+    avg_response_size = means[COLUMN['response_size']]
     print(f"平均响应大小:     {avg_response_size:.0f} bytes")
 
 if __name__ == "__main__":
@@ -6,61 +6,131 @@ WebSocket FPS Performance Test with Random QR Codes
 
 import asyncio
 import websockets
-import json
+import orjson
 import time
 import random
 import string
-import base64
+import itertools
+import pybase64
 import io
+import hashlib
+import pickle
+from pathlib import Path
 import qrcode
 from PIL import Image
+import numpy as np
+
+# 单连接上允许的最大在途请求数
+PIPELINE_DEPTH = 8
+# 关闭 permessage-deflate（PNG 图片已压缩，再压缩只消耗CPU）；放宽消息大小以容纳批量响应，取消接收队列上限
+CONNECT_OPTIONS = {'compression': None, 'max_size': 2**23, 'max_queue': None}
+# 突发模式每个 detect_batch 帧包含的图片数
+BATCH_SIZE = 8
+# 响应时间数组的初始容量，写满后翻倍
+RESPONSE_TIMES_CAPACITY = 16384
+# 二维码图片尺寸和随机种子（固定种子保证磁盘缓存内容可复现）
+QR_IMAGE_SIZE = (200, 200)
+QR_CACHE_SEED = 42
+# 磁盘缓存目录和格式版本（缓存项结构变化时递增）
+QR_CACHE_DIR = Path.home() / ".cache" / "qrcode_server_rs"
+QR_CACHE_VERSION = 2
+
+def _dumps(obj):
+    """用 orjson 序列化为文本帧（服务器将二进制帧当作原始图片处理）"""
+    return orjson.dumps(obj).decode()
+
+_loads = orjson.loads
+
+# 固定的关闭消息，预先序列化（文本帧；二进制帧会被服务器当作图片）
+_CLOSE_FRAME = '{"type":"close"}'
+
+def generate_random_text(length=20, rng=random):
+    """生成随机文本"""
+    chars = string.ascii_letters + string.digits + "!@#$%^&*()_+-=[]{}|;:,.<>?"
+    return ''.join(rng.choice(chars) for _ in range(length))
+
+def generate_qr_image(text, size=(200, 200)):
+    """生成二维码图片"""
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_L,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(text)
+    qr.make(fit=True)
+    
+    # 创建图片
+    img = qr.make_image(fill_color="black", back_color="white")
+    img = img.resize(size, Image.Resampling.LANCZOS)
+    
+    # 编码为 PNG 字节
+    buffer = io.BytesIO()
+    img.save(buffer, format='PNG')
+    
+    return text, buffer.getvalue()
+
+def _gen_one(i):
+    """生成第 i 个缓存项，返回 (文本, PNG字节, base64图片)"""
+    # 按序号播种独立的随机数生成器，保证每一项可复现且不影响全局随机状态
+    rng = random.Random(QR_CACHE_SEED + i)
+    text = f"Test QR {i}: {generate_random_text(rng=rng)}"
+    _, png_bytes = generate_qr_image(text, QR_IMAGE_SIZE)
+    return text, png_bytes, pybase64.b64encode(png_bytes).decode('ascii')
 
 class QRCodeGenerator:
     def __init__(self):
         self.qr_cache = []
+        self.image_cache = []
         self.cache_size = 20
         self.generate_cache()
     
-    def generate_random_text(self, length=20):
-        """生成随机文本"""
-        chars = string.ascii_letters + string.digits + "!@#$%^&*()_+-=[]{}|;:,.<>?"
-        return ''.join(random.choice(chars) for _ in range(length))
+    def cache_path(self):
+        """磁盘缓存文件路径，以 (缓存数量, 图片尺寸, 格式版本) 的哈希区分"""
+        key = hashlib.sha1(repr((self.cache_size, QR_IMAGE_SIZE, QR_CACHE_VERSION)).encode()).hexdigest()[:12]
+        return QR_CACHE_DIR / f"qr_cache_v{QR_CACHE_VERSION}_{key}.pkl"
     
-    def generate_qr_image(self, text, size=(200, 200)):
-        """生成二维码图片"""
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_L,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(text)
-        qr.make(fit=True)
-        
-        # 创建图片
-        img = qr.make_image(fill_color="black", back_color="white")
-        img = img.resize(size, Image.Resampling.LANCZOS)
+    def generate_cache(self):
+        """预生成二维码缓存（PNG 字节直接作为二进制帧发送），优先从磁盘加载"""
+        path = self.cache_path()
+        items = None
+        if path.exists():
+            try:
+                loaded = pickle.loads(path.read_bytes())
+                # 校验缓存结构：数量一致且每项为 (文本, PNG字节, base64) 三元组
+                if not isinstance(loaded, list) or len(loaded) != self.cache_size:
+                    raise ValueError(f"expected {self.cache_size} items")
+                if not all(isinstance(item, tuple) and len(item) == 3 for item in loaded):
+                    raise ValueError("malformed cache item")
+                items = loaded
+                print(f"✅ Loaded {len(items)} QR codes from {path}")
+            except Exception as e:
+                print(f"⚠️ Failed to load QR cache ({e}), regenerating")
         
-        # 转换为base64
-        buffer = io.BytesIO()
-        img.save(buffer, format='PNG')
-        img_str = base64.b64encode(buffer.getvalue()).decode()
+        if items is None:
+            print(f"🔄 Generating {self.cache_size} QR codes for testing...")
+            # 20 张小图顺序生成只需几十毫秒，进程池的启动开销反而更大
+            items = [_gen_one(i) for i in range(self.cache_size)]
+            try:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                path.write_bytes(pickle.dumps(items))
+            except OSError as e:
+                print(f"⚠️ Failed to save QR cache: {e}")
         
-        return text, img_str
-    
-    def generate_cache(self):
-        """预生成二维码缓存"""
-        print(f"🔄 Generating {self.cache_size} QR codes for testing...")
-        self.qr_cache = []
-        for i in range(self.cache_size):
-            text = f"Test QR {i}: {self.generate_random_text()}"
-            _, img_b64 = self.generate_qr_image(text)
-            self.qr_cache.append((text, img_b64))
-        print("✅ QR code cache generated")
+        self.qr_cache = [(text, png_bytes) for text, png_bytes, _ in items]
+        self.image_cache = [img_b64 for _, _, img_b64 in items]
+        # 预先打乱后循环取用，热循环中只做一次 next()，不再每次调用随机数生成器
+        self._qr_iter = itertools.cycle(random.sample(self.qr_cache, len(self.qr_cache)))
+        self._image_iter = itertools.cycle(random.sample(self.image_cache, len(self.image_cache)))
+        print("✅ QR code cache ready")
     
     def get_random_qr(self):
-        """获取随机二维码"""
-        return random.choice(self.qr_cache)
+        """获取随机二维码，返回 (文本, PNG字节)"""
+        return next(self._qr_iter)
+    
+    def get_random_image(self):
+        """获取随机二维码图片（base64，用于批量请求）"""
+        return next(self._image_iter)
 
 class WebSocketFPSTest:
     def __init__(self, server_url="ws://localhost:3000/ws"):
@@ -71,93 +141,112 @@ class WebSocketFPSTest:
         """连续发送测试 - 测量FPS"""
         print(f"🚀 Starting WebSocket FPS test for {duration} seconds...")
         
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
+        deadline_ns = start_ns + duration * 1_000_000_000
         sent_count = 0
         received_count = 0
         success_count = 0
         error_count = 0
         
-        response_times = []
+        # 预分配响应时间数组（ms），按 received_count 下标写入
+        response_times = np.empty(RESPONSE_TIMES_CAPACITY, dtype=np.float64)
         detection_results = []
         
         try:
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 print("✅ Connected to WebSocket")
                 
                 # 接收欢迎消息
                 welcome = await websocket.recv()
                 print("📥 Welcome message received")
                 
-                while time.time() - start_time < duration:
-                    # 获取随机二维码
-                    expected_text, qr_image = self.qr_generator.get_random_qr()
-                    
-                    # 记录发送时间
-                    send_time = time.time()
-                    
-                    # 发送检测请求
-                    message = {
-                        "type": "detect",
-                        "image": qr_image
-                    }
-                    await websocket.send(json.dumps(message))
-                    sent_count += 1
-                    
-                    # 接收响应
-                    response = await websocket.recv()
-                    receive_time = time.time()
-                    received_count += 1
-                    
-                    # 计算响应时间
-                    response_time = (receive_time - send_time) * 1000  # ms
-                    response_times.append(response_time)
-                    
-                    # 解析响应
-                    try:
-                        result = json.loads(response)
-                        if result.get('success', False):
-                            success_count += 1
-                            qrcodes = result.get('qrcodes', [])
-                            
-                            # 验证检测结果
-                            detected_texts = [qr.get('text', '') for qr in qrcodes]
-                            if expected_text in detected_texts:
-                                detection_results.append({'expected': expected_text, 'detected': True})
+                # 发送和接收并行进行；服务器按顺序响应，按发送顺序匹配期望文本
+                window = asyncio.Semaphore(PIPELINE_DEPTH)
+                pending = asyncio.Queue()
+                
+                async def sender():
+                    nonlocal sent_count
+                    while time.perf_counter_ns() < deadline_ns:
+                        await window.acquire()
+                        # 获取随机二维码
+                        expected_text, png_bytes = self.qr_generator.get_random_qr()
+                        
+                        # 记录发送时间并以二进制帧发送图片（服务器按原始图片检测，省去 base64/JSON 编码）
+                        pending.put_nowait((expected_text, time.perf_counter_ns()))
+                        await websocket.send(png_bytes)
+                        sent_count += 1
+                    pending.put_nowait(None)
+                
+                async def receiver():
+                    nonlocal received_count, success_count, error_count, response_times
+                    while (item := await pending.get()) is not None:
+                        expected_text, send_ns = item
+                        
+                        # 接收响应（bytes，不做 UTF-8 解码）并计算响应时间（ms）
+                        response = await websocket.recv(decode=False)
+                        if received_count == len(response_times):
+                            response_times = np.concatenate((response_times, np.empty_like(response_times)))
+                        response_times[received_count] = (time.perf_counter_ns() - send_ns) / 1_000_000
+                        window.release()
+                        received_count += 1
+                        
+                        # 解析响应
+                        try:
+                            result = _loads(response)
+                            if result.get('success', False):
+                                success_count += 1
+                                qrcodes = result.get('qrcodes', [])
+                                
+                                # 验证检测结果（仅在未匹配时才构造检测到的文本列表）
+                                if any(qr.get('text') == expected_text for qr in qrcodes):
+                                    detection_results.append({'expected': expected_text, 'detected': True})
+                                else:
+                                    detected_texts = [qr.get('text', '') for qr in qrcodes]
+                                    detection_results.append({'expected': expected_text, 'detected': False, 'found': detected_texts})
                             else:
-                                detection_results.append({'expected': expected_text, 'detected': False, 'found': detected_texts})
-                        else:
+                                error_count += 1
+                        except Exception as e:
                             error_count += 1
-                    except Exception as e:
-                        error_count += 1
-                        print(f"❌ Response parse error: {e}")
-                    
-                    # 显示进度
-                    if sent_count % 10 == 0:
-                        elapsed = time.time() - start_time
-                        current_fps = sent_count / elapsed
-                        print(f"📊 Progress: {sent_count} sent, {received_count} received, {current_fps:.1f} FPS")
+                            print(f"❌ Response parse error: {e}")
+                        
+                        # 显示进度
+                        if received_count % 10 == 0:
+                            elapsed = (time.perf_counter_ns() - start_ns) / 1_000_000_000
+                            current_fps = sent_count / elapsed
+                            print(f"📊 Progress: {sent_count} sent, {received_count} received, {current_fps:.1f} FPS")
+                
+                tasks = [asyncio.create_task(sender()), asyncio.create_task(receiver())]
+                try:
+                    await asyncio.gather(*tasks)
+                finally:
+                    # 任一端出错时取消另一端，避免发送端阻塞在信号量上遗留任务
+                    for task in tasks:
+                        task.cancel()
+                    await asyncio.gather(*tasks, return_exceptions=True)
                 
                 # 发送关闭消息
-                close_message = {"type": "close"}
-                await websocket.send(json.dumps(close_message))
+                await websocket.send(_CLOSE_FRAME)
                 close_response = await websocket.recv()
                 
         except Exception as e:
             print(f"❌ WebSocket error: {e}")
         
         # 计算统计信息
-        elapsed_time = time.time() - start_time
+        elapsed_time = (time.perf_counter_ns() - start_ns) / 1_000_000_000
         avg_fps = sent_count / elapsed_time
         receive_fps = received_count / elapsed_time
         success_rate = success_count / received_count * 100 if received_count > 0 else 0
         
         # 计算响应时间统计
-        if response_times:
-            avg_response_time = sum(response_times) / len(response_times)
-            min_response_time = min(response_times)
-            max_response_time = max(response_times)
+        response_times = response_times[:received_count]
+        if received_count:
+            avg_response_time = float(response_times.mean())
+            min_response_time = response_times.min()
+            max_response_time = response_times.max()
+            p50, p95, p99 = np.percentile(response_times, [50, 95, 99])
         else:
             avg_response_time = min_response_time = max_response_time = 0
+            p50 = p95 = p99 = 0
         
         # 计算检测准确率
         correct_detections = sum(1 for r in detection_results if r.get('detected', False))
@@ -177,6 +266,9 @@ class WebSocketFPSTest:
         print(f"   Average: {avg_response_time:.1f} ms")
         print(f"   Minimum: {min_response_time:.1f} ms")
         print(f"   Maximum: {max_response_time:.1f} ms")
+        print(f"   P50: {p50:.1f} ms")
+        print(f"   P95: {p95:.1f} ms")
+        print(f"   P99: {p99:.1f} ms")
         print(f"\n🎯 Detection Accuracy:")
         print(f"   Correct detections: {correct_detections}/{len(detection_results)}")
         print(f"   Accuracy rate: {detection_accuracy:.1f}%")
@@ -193,40 +285,44 @@ class WebSocketFPSTest:
         """突发模式测试 - 快速发送多个请求"""
         print(f"💥 Burst mode test: sending {burst_size} requests rapidly...")
         
-        start_time = time.time()
+        start_ns = time.perf_counter_ns()
         
         try:
-            async with websockets.connect(self.server_url) as websocket:
+            async with websockets.connect(self.server_url, **CONNECT_OPTIONS) as websocket:
                 # 接收欢迎消息
                 await websocket.recv()
                 
-                # 快速发送多个请求
+                # 快速发送多个请求：每 BATCH_SIZE 张合并为一个 detect_batch 帧，最后不足一批的单独发送
                 send_times = []
-                for i in range(burst_size):
-                    _, qr_image = self.qr_generator.get_random_qr()
-                    message = {
-                        "type": "detect", 
-                        "image": qr_image
-                    }
-                    
-                    send_start = time.time()
-                    await websocket.send(json.dumps(message))
-                    send_times.append(time.time() - send_start)
+                batch_count = 0
+                for offset in range(0, burst_size, BATCH_SIZE):
+                    batch = [self.qr_generator.get_random_image()
+                             for _ in range(min(BATCH_SIZE, burst_size - offset))]
+                    send_start_ns = time.perf_counter_ns()
+                    await websocket.send(_dumps({"type": "detect_batch", "images": batch}))
+                    send_times.append(time.perf_counter_ns() - send_start_ns)
+                    batch_count += 1
                 
-                send_duration = time.time() - start_time
+                send_duration = (time.perf_counter_ns() - start_ns) / 1_000_000_000
                 
-                # 接收所有响应
-                receive_start = time.time()
+                # 接收所有响应（每个批次一条消息，展开为单张图片的结果）
+                receive_start_ns = time.perf_counter_ns()
                 responses = []
-                for i in range(burst_size):
-                    response = await websocket.recv()
-                    responses.append(response)
+                failed_batches = 0
+                for i in range(batch_count):
+                    batch_result = _loads(await websocket.recv(decode=False))
+                    if batch_result.get('type') != 'batch_result' or not batch_result.get('success', False):
+                        # 整批失败（如超过批量上限）时没有逐张结果，单独计数并显示原因
+                        failed_batches += 1
+                        print(f"❌ Batch {i+1} failed: {batch_result.get('message', batch_result)}")
+                        continue
+                    responses.extend(batch_result.get('results', []))
                 
-                receive_duration = time.time() - receive_start
-                total_duration = time.time() - start_time
+                receive_duration = (time.perf_counter_ns() - receive_start_ns) / 1_000_000_000
+                total_duration = (time.perf_counter_ns() - start_ns) / 1_000_000_000
                 
                 # 发送关闭消息
-                await websocket.send(json.dumps({"type": "close"}))
+                await websocket.send(_CLOSE_FRAME)
                 await websocket.recv()
                 
                 print(f"📊 Burst Test Results:")
@@ -234,6 +330,7 @@ class WebSocketFPSTest:
                 print(f"   Send rate: {burst_size/send_duration:.1f} req/s")
                 print(f"   Received {len(responses)} responses in {receive_duration:.2f}s")
                 print(f"   Receive rate: {len(responses)/receive_duration:.1f} resp/s")
+                print(f"   Failed batches: {failed_batches}/{batch_count}")
                 print(f"   Total time: {total_duration:.2f}s")
                 print(f"   Overall throughput: {burst_size/total_duration:.1f} req/s")
                 
@@ -278,4 +375,10 @@ async def main():
         print(f"❌ Test suite error: {e}")
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    try:
+        import uvloop
+    except ImportError:
+        # 未安装 uvloop（如 Windows）时使用默认事件循环
+        asyncio.run(main())
+    else:
+        uvloop.run(main())